@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import skia
+
+from carousel_generator.models import Job, Slide, Template, TextBlock, TextRegion, TextStyle
+from carousel_generator.renderer import RenderContext, export_job, render_slide
+
+
+def _job(count: int) -> Job:
+    return Job(name='bench', slides=[
+        Slide(textBlocks=[
+            TextBlock(region='hero', text=f'Заголовок слайда {i}'),
+            TextBlock(region='sub', text='Подзаголовок с достаточно длинным текстом, который переносится на несколько строк. ' * 2),
+        ])
+        for i in range(count)
+    ])
+
+
+def main(count: int = 40) -> None:
+    template = Template(textRegions=[
+        TextRegion(name='hero', x=80, y=80, width=920, height=260, padding=12, overflow='shrink-to-fit', align='center', valign='middle', defaultStyle='H1'),
+        TextRegion(name='sub', x=80, y=360, width=920, height=220, padding=10, defaultStyle='H2'),
+    ])
+    styles = {'H1': TextStyle(name='H1', fontSize=86, lineHeight=1.05), 'H2': TextStyle(name='H2', fontSize=52)}
+    job = _job(count)
+    contexts = {
+        'no pool': RenderContext(skia.kRGBA_8888_ColorType, skia.kUnpremul_AlphaType, max_pooled=0),
+        'pooled': RenderContext(skia.kRGBA_8888_ColorType, skia.kUnpremul_AlphaType),
+    }
+    # Render only: no encoding, no layer cache, best of 5 rounds, so the
+    # difference is the per-slide surface allocation the pool removes.
+    for name, context in contexts.items():
+        best = float('inf')
+        for _ in range(5):
+            start = time.perf_counter()
+            for slide in job.slides:
+                image, _ = render_slide(template, styles, slide, context=context)
+                del image
+            best = min(best, time.perf_counter() - start)
+        print(f'render {count} slides, {name}: {best:.3f}s ({best / count * 1000:.2f} ms/slide)')
+    for name, context in contexts.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            export_job(template, styles, job, Path(tmp), context=context)
+            elapsed = time.perf_counter() - start
+        print(f'export {count} slides, {name}: {elapsed:.3f}s ({elapsed / count * 1000:.1f} ms/slide)')
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:2]])
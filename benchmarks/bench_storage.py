@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from carousel_generator.models import ImageBlock, Job, Slide, TextBlock
+from carousel_generator.snapshot import open_job_snapshot
+from carousel_generator.storage import job_path, load_job, save_job
+
+
+def _job(count: int) -> Job:
+    return Job(name='bench', slides=[
+        Slide(
+            textBlocks=[
+                TextBlock(region='hero', text=f'Заголовок слайда номер {i}', style='H1', align='center'),
+                TextBlock(region='sub', text='Подзаголовок, который повторяется на многих слайдах карусели.', style='H2'),
+            ],
+            imageBlocks=[ImageBlock(region='main', path=f'C:\\Project\\assets\\photo_{i % 40:03}.jpg', fit='cover')],
+        )
+        for i in range(count)
+    ])
+
+
+def _time(fn, repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(count: int = 1000) -> None:
+    job = _job(count)
+    for fmt in ['json', 'binary']:
+        with tempfile.TemporaryDirectory() as tmp:
+            project = Path(tmp)
+            (project / 'jobs').mkdir()
+            (project / 'settings.json').write_text(json.dumps({'storageFormat': fmt}), encoding='utf-8')
+            save_ms = _time(lambda: save_job(project, job))
+            load_ms = _time(lambda: load_job(project, job.name, job.template))
+            path = job_path(project, job.name, fmt)
+            line = f'{fmt:<7} {count} slides: save {save_ms:7.1f} ms, load {load_ms:7.1f} ms, size {path.stat().st_size / 1024:8.1f} KB'
+            if fmt == 'binary':
+                line += f', one slide {_time(lambda: open_job_snapshot(path).slide(count // 2)):.2f} ms'
+            print(line)
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:2]])
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import skia
+
+from carousel_generator.models import Template, TextRegion, TextStyle
+from carousel_generator.renderer import RenderCache, _draw_text_region, compile_template, layout_text
+
+SHADOW = {'color': '#B0000000', 'offsetX': 4, 'offsetY': 8, 'blur': 16}
+STROKE = {'color': '#000000', 'width': 4}
+
+
+def _bench(label: str, style: TextStyle, cached: bool, frames: int) -> None:
+    region = TextRegion(name='hero', x=80, y=80, width=920, height=400, padding=12, align='center', valign='middle')
+    text = 'Заголовок карусели с тенью и обводкой'
+    surface = skia.Surface(1080, 1350)
+    canvas = surface.getCanvas()
+    cache = RenderCache() if cached else None
+    compiled = compile_template(Template(textRegions=[region]), {style.name: style})
+    layout = layout_text(text, region, style, cache)
+    start = time.perf_counter()
+    for _ in range(frames):
+        canvas.clear(0xFF1A1A1A)
+        _draw_text_region(canvas, text, compiled.text_regions[0], compiled.style(style.name), 'center', None, layout, cache)
+        surface.flushAndSubmit()
+    elapsed = (time.perf_counter() - start) / frames * 1000
+    print(f'{label:<28} {elapsed:7.2f} ms/region')
+
+
+def main(frames: int = 50) -> None:
+    base = dict(name='H1', fontSize=86, lineHeight=1.05)
+    _bench('fill', TextStyle(**base), True, frames)
+    _bench('fill + stroke', TextStyle(**base, stroke=STROKE), True, frames)
+    _bench('shadow, blur every frame', TextStyle(**base, shadow=SHADOW), False, frames)
+    _bench('shadow, cached layer', TextStyle(**base, shadow=SHADOW), True, frames)
+    _bench('stroke + shadow, cached', TextStyle(**base, stroke=STROKE, shadow=SHADOW), True, frames)
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:2]])
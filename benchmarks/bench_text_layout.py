@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from carousel_generator.models import Job, Slide, Template, TextBlock, TextRegion, TextStyle
+from carousel_generator.renderer import RenderCache, layout_job_text
+
+
+def main(count: int = 200) -> None:
+    rng = random.Random(7)
+    vocab = ['карусель', 'заголовок', 'текст', 'слайд', 'Instagram', 'post', 'и', 'для', 'generator']
+    template = Template(textRegions=[
+        TextRegion(name='hero', x=80, y=80, width=920, height=260, padding=12, overflow='shrink-to-fit', defaultStyle='H1'),
+        TextRegion(name='sub', x=80, y=360, width=920, height=220, padding=10, defaultStyle='H2'),
+    ])
+    styles = {'H1': TextStyle(name='H1', fontSize=86, lineHeight=1.05, letterSpacing=1.5), 'H2': TextStyle(name='H2', fontSize=52)}
+    job = Job(slides=[
+        Slide(textBlocks=[
+            TextBlock(region='hero', text=' '.join(rng.choice(vocab) for _ in range(rng.randint(4, 30)))),
+            TextBlock(region='sub', text=' '.join(rng.choice(vocab) for _ in range(rng.randint(20, 80)))),
+        ])
+        for _ in range(count)
+    ])
+    start = time.perf_counter()
+    layout_job_text(template, styles, job, RenderCache())
+    elapsed = time.perf_counter() - start
+    print(f'layout {count * 2} text blocks: {elapsed:.3f}s ({elapsed / count / 2 * 1000:.2f} ms/block)')
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:2]])
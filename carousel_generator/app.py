@@ -1,21 +1,104 @@
 from __future__ import annotations
 
 import sys
+import time
+import traceback
 from pathlib import Path
 
-from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QThread, Qt, Signal
+from PySide6.QtWidgets import QApplication, QLabel, QMessageBox
 
-from .storage import ensure_project, load_job, load_styles, load_template
-from .ui.main_window import MainWindow
+
+class StartupTrace:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks: list[tuple[float, str]] = []
+
+    def mark(self, label: str) -> None:
+        self.marks.append(((time.perf_counter() - self.start) * 1000, label))
+
+    def report(self) -> str:
+        return '\n'.join(f'{elapsed:8.1f} ms  {label}' for elapsed, label in self.marks) + '\n'
+
+
+class ProjectLoader(QThread):
+    loaded = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, project_dir: Path, trace: StartupTrace):
+        super().__init__()
+        self.project_dir = project_dir
+        self.trace = trace
+
+    def run(self):
+        try:
+            self.loaded.emit(self._load())
+        except Exception as exc:
+            traceback.print_exc()
+            self.failed.emit(f'{type(exc).__name__}: {exc}')
+
+    def _load(self):
+        from .memory import default_budget
+        from .storage import ensure_project, load_job, load_settings, load_styles, load_template
+
+        ensure_project(self.project_dir)
+        settings = load_settings(self.project_dir)
+        default_budget.set_limit(int(settings['memoryBudgetMB']) * 1024 * 1024)
+        template = load_template(self.project_dir, 'carousel_default')
+        styles = load_styles(self.project_dir)
+        job = load_job(self.project_dir, 'job_default', template.name)
+        self.trace.mark('project loaded')
+
+        from .renderer import RenderCache, compile_template, layout_job_text, render_slide, warm_fonts
+
+        self.trace.mark('renderer imported')
+        warm_fonts(styles)
+        compiled = compile_template(template, styles)
+        self.trace.mark('fonts resolved')
+        render_cache = RenderCache()
+        layout_job_text(compiled, styles, job, render_cache)
+        self.trace.mark('text laid out')
+        if job.slides:
+            render_slide(compiled, styles, job.slides[0], render_cache)
+        self.trace.mark('first slide rendered')
+        return settings, template, styles, job, render_cache
 
 
 def main() -> None:
+    trace = StartupTrace()
     app = QApplication(sys.argv)
+    splash = QLabel('Загрузка проекта…')
+    splash.setWindowTitle('Carousel Generator')
+    splash.setAlignment(Qt.AlignCenter)
+    splash.resize(1500, 900)
+    splash.show()
+    trace.mark('window shown')
+
     project_dir = Path.cwd() / 'Project'
-    ensure_project(project_dir)
-    template = load_template(project_dir, 'carousel_default')
-    styles = load_styles(project_dir)
-    job = load_job(project_dir, 'job_default', template.name)
-    window = MainWindow(project_dir, template, styles, job)
-    window.show()
-    sys.exit(app.exec())
+    loader = ProjectLoader(project_dir, trace)
+    windows = []
+
+    def on_loaded(payload):
+        settings, template, styles, job, render_cache = payload
+        from .ui.main_window import MainWindow
+
+        window = MainWindow(project_dir, template, styles, job, render_cache, settings['storageFormat'])
+        window.setGeometry(splash.geometry())
+        window.show()
+        splash.close()
+        windows.append(window)
+        trace.mark('main window ready')
+        if settings.get('startupTrace'):
+            (project_dir / 'startup.log').write_text(trace.report(), encoding='utf-8')
+
+    def on_failed(message):
+        splash.close()
+        QMessageBox.critical(None, 'Ошибка загрузки проекта', message)
+        app.exit(1)
+
+    loader.loaded.connect(on_loaded, Qt.QueuedConnection)
+    loader.failed.connect(on_failed, Qt.QueuedConnection)
+    loader.start()
+    code = app.exec()
+    loader.wait()
+    sys.exit(code)
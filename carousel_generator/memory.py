@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator
+
+DEFAULT_BUDGET_MB = 1024
+
+
+class MemoryBudget:
+    def __init__(self, limit_bytes: int = DEFAULT_BUDGET_MB * 1024 * 1024):
+        self.limit_bytes = limit_bytes
+        self.total_bytes = 0
+        self._entries: OrderedDict[tuple[int, Hashable], int] = OrderedDict()
+        self._caches: weakref.WeakValueDictionary[int, MemoryCache] = weakref.WeakValueDictionary()
+        self._lock = threading.RLock()
+
+    def set_limit(self, limit_bytes: int) -> None:
+        with self._lock:
+            self.limit_bytes = limit_bytes
+            self._enforce()
+
+    def usage(self) -> dict[str, tuple[int, int]]:
+        with self._lock:
+            out: dict[str, tuple[int, int]] = {}
+            for cache in self._caches.values():
+                entries, nbytes = out.get(cache.name, (0, 0))
+                out[cache.name] = (entries + len(cache), nbytes + cache.nbytes)
+            return out
+
+    def _register(self, cache: MemoryCache) -> None:
+        with self._lock:
+            self._caches[id(cache)] = cache
+
+    def _release(self, cache_id: int) -> None:
+        with self._lock:
+            self._caches.pop(cache_id, None)
+            for entry in [x for x in self._entries if x[0] == cache_id]:
+                self.total_bytes -= self._entries.pop(entry)
+
+    def _touch(self, cache: MemoryCache, key: Hashable) -> None:
+        with self._lock:
+            self._entries.move_to_end((id(cache), key))
+
+    def _add(self, cache: MemoryCache, key: Hashable, nbytes: int) -> None:
+        with self._lock:
+            self._entries[(id(cache), key)] = nbytes
+            self.total_bytes += nbytes
+            self._enforce(keep=(id(cache), key))
+
+    def _remove(self, cache: MemoryCache, key: Hashable) -> None:
+        with self._lock:
+            self.total_bytes -= self._entries.pop((id(cache), key), 0)
+
+    def _enforce(self, keep: tuple[int, Hashable] | None = None) -> None:
+        while self.total_bytes > self.limit_bytes and self._entries:
+            entry = next(iter(self._entries))
+            if entry == keep:
+                if len(self._entries) == 1:
+                    break
+                self._entries.move_to_end(entry)
+                continue
+            cache = self._caches.get(entry[0])
+            if cache is None:
+                self.total_bytes -= self._entries.pop(entry)
+                continue
+            cache._evict(entry[1])
+
+
+class MemoryCache:
+    def __init__(self, name: str, sizeof: Callable[[Any], int], budget: MemoryBudget | None = None):
+        self.name = name
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self.budget = budget or default_budget
+        self._items: dict[Hashable, tuple[Any, int]] = {}
+        self.budget._register(self)
+        self._finalizer = weakref.finalize(self, self.budget._release, id(self))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._items))
+
+    def __getitem__(self, key: Hashable) -> Any:
+        with self.budget._lock:
+            value = self._items[key][0]
+            self.budget._touch(self, key)
+            return value
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        with self.budget._lock:
+            self.pop(key)
+            nbytes = self.sizeof(value)
+            self._items[key] = (value, nbytes)
+            self.nbytes += nbytes
+            self.budget._add(self, key, nbytes)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.budget._lock:
+            item = self._items.get(key)
+            if item is None:
+                return default
+            self.budget._touch(self, key)
+            return item[0]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self.budget._lock:
+            item = self._items.pop(key, None)
+            if item is None:
+                return default
+            self.nbytes -= item[1]
+            self.budget._remove(self, key)
+            return item[0]
+
+    def clear(self) -> None:
+        with self.budget._lock:
+            for key in list(self._items):
+                self.pop(key)
+
+    def close(self) -> None:
+        self._finalizer()
+        self._items.clear()
+        self.nbytes = 0
+
+    def _evict(self, key: Hashable) -> None:
+        self.pop(key)
+
+
+default_budget = MemoryBudget()
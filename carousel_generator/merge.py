@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import csv
+import json
+import re
+import threading
+from dataclasses import replace
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from .models import Job, Slide, Template, TextStyle
+from .renderer import CompiledTemplate, ExportEvent, export_many
+
+PLACEHOLDER_RE = re.compile(r'\{(\w+)\}')
+
+
+def iter_rows(path: Path) -> Iterator[dict[str, str]]:
+    suffix = path.suffix.lower()
+    if suffix == '.csv':
+        with path.open(encoding='utf-8-sig', newline='') as fh:
+            yield from csv.DictReader(fh)
+    elif suffix in ('.jsonl', '.ndjson'):
+        with path.open(encoding='utf-8') as fh:
+            for number, line in enumerate(fh, start=1):
+                if line.strip():
+                    yield _json_row(line, number)
+    else:
+        raise ValueError(f'Неподдерживаемый формат данных: {path.suffix}')
+
+
+def merge_job(job: Job, row: dict[str, str], name: str) -> tuple[Job, list[str]]:
+    missing: set[str] = set()
+
+    def fill(value: str) -> str:
+        if '{' not in value:
+            return value
+        return PLACEHOLDER_RE.sub(lambda m: _lookup(row, m, missing), value)
+
+    slides = [
+        Slide(
+            textBlocks=[replace(b, text=fill(b.text)) for b in slide.textBlocks],
+            imageBlocks=[replace(b, path=fill(b.path)) for b in slide.imageBlocks],
+        )
+        for slide in job.slides
+    ]
+    warnings = [f'Нет значения для {{{key}}}' for key in sorted(missing)]
+    return Job(name=name, template=job.template, slides=slides), warnings
+
+
+def iter_merged_jobs(job: Job, rows: Iterable[dict[str, str]]) -> Iterator[tuple[Job, list[str]]]:
+    for idx, row in enumerate(rows, start=1):
+        yield merge_job(job, row, f'{job.name}_{idx:05}')
+
+
+def export_merge(template: Template | CompiledTemplate, styles: dict[str, TextStyle], job: Job, data_path: Path, output_dir: Path, fmt: str = 'png', workers: int | None = None, cancel: threading.Event | None = None) -> Iterator[ExportEvent]:
+    merge_warnings: dict[Path, list[str]] = {}
+
+    def jobs() -> Iterator[tuple[Job, Path]]:
+        for merged, warnings in iter_merged_jobs(job, iter_rows(data_path)):
+            target = output_dir / merged.name
+            merge_warnings[target] = warnings
+            yield merged, target
+
+    for idx, (target, warnings) in enumerate(export_many(template, styles, jobs(), fmt=fmt, workers=workers, cancel=cancel), start=1):
+        prefix = f'[{target.name}] '
+        yield ExportEvent(idx, 0, target, [prefix + w for w in merge_warnings.pop(target, []) + warnings])
+
+
+def _json_row(line: str, number: int) -> dict[str, str]:
+    try:
+        row = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f'Строка {number}: некорректный JSON ({exc.msg})') from exc
+    if not isinstance(row, dict):
+        raise ValueError(f'Строка {number}: ожидался объект, получено {type(row).__name__}')
+    return row
+
+
+def _lookup(row: dict[str, str], match: re.Match, missing: set[str]) -> str:
+    value = row.get(match.group(1))
+    if value is None:
+        missing.add(match.group(1))
+        return match.group(0)
+    return str(value)
@@ -1,10 +1,22 @@
 from __future__ import annotations
 
-from dataclasses import replace
+import math
+import os
+import re
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from functools import lru_cache, partial
 from pathlib import Path
+from typing import Callable, Iterable, Iterator
 
+import numpy as np
 import skia
 
+from .memory import MemoryCache, default_budget
 from .models import ImageRegion, Job, Slide, Template, TextRegion, TextStyle
 
 
@@ -12,68 +24,387 @@ class RenderWarning(Exception):
     pass
 
 
-def render_slide(template: Template, styles: dict[str, TextStyle], slide: Slide) -> tuple[skia.Image, list[str]]:
-    surface = skia.Surface(template.width, template.height)
+class RenderContext:
+    def __init__(self, color_type: skia.ColorType = skia.kN32_ColorType, alpha_type: skia.AlphaType = skia.kPremul_AlphaType, max_pooled: int = 2):
+        self.color_type = color_type
+        self.alpha_type = alpha_type
+        self.max_pooled = max_pooled
+        self._pool: dict[tuple[int, int], list[skia.Surface]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def surface(self, width: int, height: int) -> Iterator[skia.Surface]:
+        with self._lock:
+            free = self._pool.setdefault((width, height), [])
+            surface = free.pop() if free else None
+        if surface is None:
+            surface = skia.Surface.MakeRaster(skia.ImageInfo.Make(width, height, self.color_type, self.alpha_type))
+        try:
+            yield surface
+        finally:
+            surface.getCanvas().restoreToCount(1)
+            with self._lock:
+                free = self._pool[(width, height)]
+                if len(free) < self.max_pooled:
+                    free.append(surface)
+
+
+_default_context = RenderContext()
+
+MAX_EXPORT_WORKERS = 4
+
+
+@dataclass
+class RenderCache:
+    layers: MemoryCache = field(default_factory=lambda: MemoryCache('render.layers', lambda layer: layer[0].approximateBytesUsed() + layer[2]))
+    images: MemoryCache = field(default_factory=lambda: MemoryCache('render.images', image_nbytes))
+    layouts: MemoryCache = field(default_factory=lambda: MemoryCache('render.layouts', lambda layout: 64 + sum(len(x) * 2 for x in layout.lines)))
+    blobs: MemoryCache = field(default_factory=lambda: MemoryCache('render.text_blobs', lambda item: 256))
+    effects: MemoryCache = field(default_factory=lambda: MemoryCache('render.text_effects', lambda item: image_nbytes(item[0])))
+
+
+@dataclass
+class TextLayout:
+    size: float
+    lines: list[str]
+
+
+@dataclass
+class ResolvedStyle:
+    style: TextStyle
+    warnings: list[str]
+    typeface: skia.Typeface
+    color: int
+    stroke: skia.Paint | None
+    effects_key: tuple
+    key: tuple
+
+
+@dataclass
+class CompiledTextRegion:
+    region: TextRegion
+    rect: skia.Rect
+    inner: skia.Rect
+
+
+@dataclass
+class CompiledImageRegion:
+    region: ImageRegion
+    rect: skia.Rect
+
+
+class CompiledTemplate:
+    def __init__(self, template: Template, styles: dict[str, TextStyle]):
+        self.template = template
+        self.styles = styles
+        self.background = _color(template.background)
+        self.text_regions = [
+            CompiledTextRegion(
+                x,
+                skia.Rect.MakeXYWH(x.x, x.y, x.width, x.height),
+                skia.Rect.MakeXYWH(x.x + x.padding, x.y + x.padding, max(1, x.width - 2 * x.padding), max(1, x.height - 2 * x.padding)),
+            )
+            for x in template.textRegions
+        ]
+        self.image_regions = [CompiledImageRegion(x, skia.Rect.MakeXYWH(x.x, x.y, x.width, x.height)) for x in template.imageRegions]
+        self._styles: dict[str, ResolvedStyle] = {}
+        for name in [*styles, *(x.defaultStyle for x in template.textRegions)]:
+            self.style(name)
+
+    def style(self, name: str) -> ResolvedStyle:
+        resolved = self._styles.get(name)
+        if resolved is None:
+            style, warnings = _resolve_style(self.styles, name)
+            effects_key = (tuple(sorted((style.shadow or {}).items())), tuple(sorted((style.stroke or {}).items())))
+            key = (style.fontFamily, style.fontSize, style.lineHeight, style.letterSpacing, style.color, effects_key, tuple(warnings))
+            resolved = ResolvedStyle(style, warnings, _typeface(style.fontFamily), _color(style.color), _stroke_paint(style.stroke), effects_key, key)
+            self._styles[name] = resolved
+        return resolved
+
+
+def compile_template(template: Template | CompiledTemplate, styles: dict[str, TextStyle]) -> CompiledTemplate:
+    # A compiled template is reused only for the styles it was built from.
+    if isinstance(template, CompiledTemplate):
+        if styles is template.styles:
+            return template
+        template = template.template
+    return CompiledTemplate(template, styles)
+
+
+def render_slide(template: Template | CompiledTemplate, styles: dict[str, TextStyle], slide: Slide, cache: RenderCache | None = None, context: RenderContext | None = None) -> tuple[skia.Image, list[str]]:
+    compiled = compile_template(template, styles)
+    with (context or _default_context).surface(compiled.template.width, compiled.template.height) as surface:
+        return _render_to_surface(surface, compiled, slide, cache)
+
+
+def _render_to_surface(surface: skia.Surface, compiled: CompiledTemplate, slide: Slide, cache: RenderCache | None) -> tuple[skia.Image, list[str]]:
     canvas = surface.getCanvas()
     warnings: list[str] = []
-    canvas.clear(_color(template.background))
+    canvas.clear(compiled.background)
+
+    for key, draw in _slide_layers(compiled, slide, cache):
+        # Image layers draw straight from the decoded image cache: a Picture
+        # would keep the pixels alive after the budget evicted them.
+        if cache is None or key[0] == 'image':
+            warnings.extend(draw(canvas)[0])
+            continue
+        layer = cache.layers.get(key)
+        if layer is None:
+            recorder = skia.PictureRecorder()
+            layer_warnings, retained = draw(recorder.beginRecording(skia.Rect.MakeWH(compiled.template.width, compiled.template.height)))
+            layer = (recorder.finishRecordingAsPicture(), layer_warnings, retained)
+            cache.layers[key] = layer
+        canvas.drawPicture(layer[0])
+        warnings.extend(layer[1])
+
+    return surface.makeImageSnapshot(), warnings
+
+
+def slide_fingerprint(template: Template | CompiledTemplate, slide: Slide) -> tuple:
+    compiled = template if isinstance(template, CompiledTemplate) else compile_template(template, {})
+    return tuple(key for key, _ in _slide_layers(compiled, slide, None))
+
+
+@dataclass
+class ExportEvent:
+    index: int
+    total: int
+    path: Path
+    warnings: list[str] = field(default_factory=list)
+
+
+def iter_export_job(template: Template | CompiledTemplate, styles: dict[str, TextStyle], job: Job, output_dir: Path, fmt: str = 'png', jpg_quality: int = 92, context: RenderContext | None = None, cancel: threading.Event | None = None) -> Iterator[ExportEvent]:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    compiled = compile_template(template, styles)
+    cache = RenderCache()
+    context = context or RenderContext(skia.kRGBA_8888_ColorType, skia.kUnpremul_AlphaType)
+    # Duplicates are copied from the first file written, so no encoded payload outlives its slide.
+    written: dict[tuple, tuple[Path, list[str]]] = {}
+    total = len(job.slides)
+    ext = 'jpg' if fmt == 'jpg' else 'png'
+    for idx, slide in enumerate(job.slides, start=1):
+        if cancel is not None and cancel.is_set():
+            return
+        key = slide_fingerprint(compiled, slide)
+        path = output_dir / f'slide_{idx:02}.{ext}'
+        if key in written:
+            source, slide_warnings = written[key]
+            shutil.copyfile(source, path)
+        else:
+            data, slide_warnings = _encode_slide(compiled, slide, cache, context, fmt, jpg_quality)
+            path.write_bytes(data)
+            written[key] = (path, slide_warnings)
+        yield ExportEvent(idx, total, path, [f'[slide {idx}] {w}' for w in slide_warnings])
+
+
+def export_job(template: Template | CompiledTemplate, styles: dict[str, TextStyle], job: Job, output_dir: Path, fmt: str = 'png', jpg_quality: int = 92, context: RenderContext | None = None) -> list[str]:
+    warnings: list[str] = []
+    for event in iter_export_job(template, styles, job, output_dir, fmt, jpg_quality, context):
+        warnings.extend(event.warnings)
+    return warnings
+
+
+def export_many(template: Template | CompiledTemplate, styles: dict[str, TextStyle], jobs: Iterable[tuple[Job, Path]], fmt: str = 'png', jpg_quality: int = 92, workers: int | None = None, cancel: threading.Event | None = None) -> Iterator[tuple[Path, list[str]]]:
+    # At most 2 * workers jobs are in flight, so memory does not grow with the input.
+    # The workers split this process's memory budget between them.
+    if isinstance(template, CompiledTemplate):
+        template = template.template
+    workers = workers or min(MAX_EXPORT_WORKERS, os.cpu_count() or 1)
+    with ProcessPoolExecutor(workers, initializer=_init_export_worker, initargs=(template, styles, default_budget.limit_bytes // workers)) as pool:
+        pending: deque[Future] = deque()
+        for job, output_dir in jobs:
+            if cancel is not None and cancel.is_set():
+                break
+            pending.append(pool.submit(_export_worker_job, job, output_dir, fmt, jpg_quality))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            if cancel is not None and cancel.is_set():
+                for future in pending:
+                    future.cancel()
+                break
+            yield pending.popleft().result()
+
+
+_worker_compiled: CompiledTemplate | None = None
+
+
+def _init_export_worker(template: Template, styles: dict[str, TextStyle], memory_limit: int) -> None:
+    global _worker_compiled
+    default_budget.set_limit(memory_limit)
+    _worker_compiled = compile_template(template, styles)
+
+
+def _export_worker_job(job: Job, output_dir: Path, fmt: str, jpg_quality: int) -> tuple[Path, list[str]]:
+    return output_dir, export_job(_worker_compiled, _worker_compiled.styles, job, output_dir, fmt, jpg_quality)
+
+
+def _encode_slide(compiled: CompiledTemplate, slide: Slide, cache: RenderCache, context: RenderContext, fmt: str, jpg_quality: int) -> tuple[bytes, list[str]]:
+    # The snapshot must be dropped before the pooled surface is drawn again, otherwise skia copies it on write.
+    image, warnings = render_slide(compiled, compiled.styles, slide, cache, context)
+    data = image.encodeToData(skia.EncodedImageFormat.kJPEG if fmt == 'jpg' else skia.EncodedImageFormat.kPNG, jpg_quality)
+    return bytes(data), warnings
+
+
+def image_nbytes(image: skia.Image) -> int:
+    return image.imageInfo().computeMinByteSize()
+
+
+def image_to_png_bytes(image: skia.Image) -> bytes:
+    return bytes(image.encodeToData(skia.EncodedImageFormat.kPNG, 100))
+
+
+def make_proxy(image: skia.Image, max_side: int = 1024) -> skia.Image:
+    scale = max_side / max(image.width(), image.height())
+    if scale >= 1:
+        return image
+    width, height = max(1, round(image.width() * scale)), max(1, round(image.height() * scale))
+    surface = skia.Surface(width, height)
+    surface.getCanvas().drawImageRect(image, skia.Rect.MakeWH(width, height), skia.SamplingOptions(skia.FilterMode.kLinear, skia.MipmapMode.kLinear))
+    return surface.makeImageSnapshot()
+
+
+def render_image_proxy(proxy: skia.Image, region: ImageRegion, fit: str, crop: dict[str, float], scale: float) -> skia.Image:
+    local = replace(region, x=0, y=0, width=max(1, round(region.width * scale)), height=max(1, round(region.height * scale)))
+    surface = skia.Surface(local.width, local.height)
+    canvas = surface.getCanvas()
+    canvas.clear(_color('#2E2E2E'))
+    _draw_image_region(canvas, proxy, local, fit, crop)
+    return surface.makeImageSnapshot()
+
+
+def measure_advances(text: str, font: skia.Font) -> np.ndarray:
+    return np.asarray(font.getWidths(font.textToGlyphs(text)), dtype=np.float64)
+
+
+def layout_text(text: str, region: TextRegion, style: TextStyle, cache: RenderCache | None = None) -> TextLayout:
+    key = (text, region.width, region.height, region.padding, region.overflow, style.fontFamily, style.fontSize, style.lineHeight, style.letterSpacing)
+    layout = cache.layouts.get(key) if cache is not None else None
+    if layout is not None:
+        return layout
+    inner_w = max(1, region.width - 2 * region.padding)
+    inner_h = max(1, region.height - 2 * region.padding)
+    size = style.fontSize
+    while True:
+        font = skia.Font(_typeface(style.fontFamily), size)
+        lines = _layout_lines(text, font, inner_w, style.letterSpacing, region.overflow)
+        total_h = size * style.lineHeight * max(1, len(lines))
+        if region.overflow == 'shrink-to-fit' and total_h > inner_h and size > 8:
+            size -= 1
+            continue
+        break
+    layout = TextLayout(size, lines)
+    if cache is not None:
+        cache.layouts[key] = layout
+    return layout
 
+
+def layout_job_text(template: Template | CompiledTemplate, styles: dict[str, TextStyle], job: Job, cache: RenderCache) -> None:
+    compiled = compile_template(template, styles)
+    regions = {x.region.name: x.region for x in compiled.text_regions}
+    for slide in job.slides:
+        for block in slide.textBlocks:
+            region = regions.get(block.region)
+            if region is None:
+                continue
+            layout_text(block.text, region, compiled.style(block.style or region.defaultStyle).style, cache)
+
+
+def warm_fonts(styles: dict[str, TextStyle]) -> None:
+    for style in styles.values():
+        if _font_available(style.fontFamily):
+            _typeface(style.fontFamily)
+    _typeface('Arial')
+
+
+@lru_cache(maxsize=None)
+def _font_available(name: str) -> bool:
+    fm = skia.FontMgr.RefDefault()
+    return fm.matchFamily(name) is not None
+
+
+@lru_cache(maxsize=None)
+def _typeface(name: str) -> skia.Typeface:
+    return skia.Typeface(name)
+
+
+# A layer draw returns its warnings and the bytes of cached rasters it references.
+LayerDraw = Callable[[skia.Canvas], tuple[list[str], int]]
+
+
+def _slide_layers(compiled: CompiledTemplate, slide: Slide, cache: RenderCache | None) -> list[tuple[tuple, LayerDraw]]:
     text_map = {x.region: x for x in slide.textBlocks}
     image_map = {x.region: x for x in slide.imageBlocks}
+    layers: list[tuple[tuple, LayerDraw]] = []
 
-    for region in template.imageRegions:
+    for compiled_region in compiled.image_regions:
+        region = compiled_region.region
         block = image_map.get(region.name)
         if not block or not block.path:
             continue
         fit = block.fit or region.fit
         crop = block.crop or region.defaultCrop
-        if not Path(block.path).exists():
-            warnings.append(f'Изображение не найдено: {block.path}')
-            _draw_placeholder(canvas, region)
-            continue
-        image = skia.Image.open(block.path)
-        _draw_image_region(canvas, image, region, fit, crop)
+        stamp = _file_stamp(block.path)
+        key = ('image', region.name, region.x, region.y, region.width, region.height, block.path, stamp, fit, tuple(sorted(crop.items())))
+        layers.append((key, partial(_draw_image_layer, region=compiled_region, path=block.path, stamp=stamp, fit=fit, crop=crop, cache=cache)))
 
-    for region in template.textRegions:
+    for compiled_region in compiled.text_regions:
+        region = compiled_region.region
         block = text_map.get(region.name)
         if not block:
             continue
         style_name = block.style or region.defaultStyle
-        style = styles.get(style_name)
-        if style is None:
-            warnings.append(f'Стиль отсутствует: {style_name}; fallback Arial')
-            style = TextStyle(name='fallback')
-        if not _font_available(style.fontFamily):
-            warnings.append(f'Шрифт не найден: {style.fontFamily}; fallback Arial')
-            style = replace(style, fontFamily='Arial')
-        _draw_text_region(canvas, block.text, region, style, block.align or region.align, block.color)
+        align = block.align or region.align
+        style = compiled.style(style_name)
+        # Geometry and resolved style values, not just names: one RenderCache may serve several templates and style sets.
+        geometry = (region.x, region.y, region.width, region.height, region.padding, region.overflow, region.valign)
+        key = ('text', region.name, geometry, block.text, style.key, align, block.color)
+        layers.append((key, partial(_draw_text_layer, region=compiled_region, style=style, text=block.text, align=align, color=block.color, cache=cache)))
 
-    return surface.makeImageSnapshot(), warnings
+    return layers
 
 
-def export_job(template: Template, styles: dict[str, TextStyle], job: Job, output_dir: Path, fmt: str = 'png', jpg_quality: int = 92) -> list[str]:
-    output_dir.mkdir(parents=True, exist_ok=True)
-    warnings: list[str] = []
-    for idx, slide in enumerate(job.slides, start=1):
-        image, slide_warnings = render_slide(template, styles, slide)
-        warnings.extend([f'[slide {idx}] {w}' for w in slide_warnings])
-        data = image.encodeToData(skia.kJPEG_Type if fmt == 'jpg' else skia.kPNG_Type, jpg_quality)
-        ext = 'jpg' if fmt == 'jpg' else 'png'
-        (output_dir / f'slide_{idx:02}.{ext}').write_bytes(bytes(data))
-    return warnings
+def _file_stamp(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
 
 
-def image_to_png_bytes(image: skia.Image) -> bytes:
-    return bytes(image.encodeToData(skia.kPNG_Type, 100))
+def _draw_image_layer(canvas: skia.Canvas, region: CompiledImageRegion, path: str, stamp: tuple[int, int] | None, fit: str, crop: dict[str, float], cache: RenderCache | None) -> tuple[list[str], int]:
+    if stamp is None:
+        _draw_placeholder(canvas, region.rect)
+        return [f'Изображение не найдено: {path}'], 0
+    image = cache.images.get((path, stamp)) if cache is not None else None
+    if image is None:
+        # Decoded up front, bypassing skia's resource cache, so the pixels
+        # live only here and the budget's charge for them is real.
+        image = skia.Image.open(path).makeRasterImage(skia.Image.CachingHint.kDisallow_CachingHint)
+        if cache is not None:
+            cache.images[(path, stamp)] = image
+    _draw_image_region(canvas, image, region.region, fit, crop)
+    return [], image_nbytes(image)
 
 
-def _font_available(name: str) -> bool:
-    fm = skia.FontMgr.RefDefault()
-    return fm.matchFamily(name) is not None
+def _draw_text_layer(canvas: skia.Canvas, region: CompiledTextRegion, style: ResolvedStyle, text: str, align: str, color: str | None, cache: RenderCache | None) -> tuple[list[str], int]:
+    retained = _draw_text_region(canvas, text, region, style, align, color, layout_text(text, region.region, style.style, cache), cache)
+    return list(style.warnings), retained
 
 
-def _draw_placeholder(canvas: skia.Canvas, region: ImageRegion) -> None:
-    rect = skia.Rect.MakeXYWH(region.x, region.y, region.width, region.height)
+def _resolve_style(styles: dict[str, TextStyle], style_name: str) -> tuple[TextStyle, list[str]]:
+    warnings: list[str] = []
+    style = styles.get(style_name)
+    if style is None:
+        warnings.append(f'Стиль отсутствует: {style_name}; fallback Arial')
+        style = TextStyle(name='fallback')
+    if not _font_available(style.fontFamily):
+        warnings.append(f'Шрифт не найден: {style.fontFamily}; fallback Arial')
+        style = replace(style, fontFamily='Arial')
+    return style, warnings
+
+
+def _draw_placeholder(canvas: skia.Canvas, rect: skia.Rect) -> None:
     p = skia.Paint(Color=_color('#2E2E2E'))
     canvas.drawRect(rect, p)
     border = skia.Paint(Color=_color('#777777'), Style=skia.Paint.kStroke_Style, StrokeWidth=3)
@@ -106,28 +437,13 @@ def _draw_image_region(canvas: skia.Canvas, image: skia.Image, region: ImageRegi
     canvas.restore()
 
 
-def _draw_text_region(canvas: skia.Canvas, text: str, region: TextRegion, style: TextStyle, align: str, override_color: str | None) -> None:
-    rect = skia.Rect.MakeXYWH(region.x, region.y, region.width, region.height)
-    inner = skia.Rect.MakeXYWH(
-        rect.left() + region.padding,
-        rect.top() + region.padding,
-        max(1, rect.width() - 2 * region.padding),
-        max(1, rect.height() - 2 * region.padding),
-    )
-
-    size = style.fontSize
-    lines: list[str]
-    while True:
-        font = skia.Font(skia.Typeface(style.fontFamily), size)
-        lines = _layout_lines(text, font, inner.width(), style.letterSpacing, region.overflow)
-        line_h = size * style.lineHeight
-        total_h = line_h * max(1, len(lines))
-        if region.overflow == 'shrink-to-fit' and total_h > inner.height() and size > 8:
-            size -= 1
-            continue
-        break
+def _draw_text_region(canvas: skia.Canvas, text: str, compiled: CompiledTextRegion, resolved: ResolvedStyle, align: str, override_color: str | None, layout: TextLayout | None = None, cache: RenderCache | None = None) -> int:
+    region, rect, inner, style = compiled.region, compiled.rect, compiled.inner, resolved.style
+    layout = layout or layout_text(text, region, style)
+    size, lines = layout.size, layout.lines
+    font = skia.Font(resolved.typeface, size)
 
-    paint = skia.Paint(Color=_color(override_color or style.color), AntiAlias=True)
+    paint = skia.Paint(Color=_color(override_color) if override_color else resolved.color, AntiAlias=True)
     line_h = size * style.lineHeight
     total_h = line_h * len(lines)
     if region.valign == 'middle':
@@ -137,54 +453,129 @@ def _draw_text_region(canvas: skia.Canvas, text: str, region: TextRegion, style:
     else:
         y = inner.top() + size
 
-    canvas.save()
-    canvas.clipRect(rect)
+    placements: list[tuple[skia.TextBlob, float, float]] = []
     for line in lines:
-        font = skia.Font(skia.Typeface(style.fontFamily), size)
-        line_w = font.measureText(line)
+        blob, line_w = _line_blob(line, font, style.letterSpacing, cache)
         if align == 'center':
             x = inner.left() + (inner.width() - line_w) / 2
         elif align == 'right':
             x = inner.right() - line_w
         else:
             x = inner.left()
-        canvas.drawString(line, x, y, font, paint)
+        if blob is not None:
+            placements.append((blob, x, y))
         y += line_h
         if y > inner.bottom() + line_h:
             break
+
+    stroke = resolved.stroke
+    canvas.save()
+    canvas.clipRect(rect)
+    if style.shadow:
+        key = (tuple(lines), style.fontFamily, size, style.letterSpacing, style.lineHeight, align, region.width, region.height, region.padding, region.valign, resolved.effects_key)
+        shadow = cache.effects.get(key) if cache is not None else None
+        if shadow is None:
+            shadow = _shadow_layer(placements, rect, style.shadow, stroke)
+            if cache is not None:
+                cache.effects[key] = shadow
+        image, dx, dy = shadow
+        canvas.drawImage(image, rect.left() + dx, rect.top() + dy)
+    for blob, x, y in placements:
+        if stroke is not None:
+            canvas.drawTextBlob(blob, x, y, stroke)
+        canvas.drawTextBlob(blob, x, y, paint)
     canvas.restore()
+    return image_nbytes(shadow[0]) if style.shadow else 0
+
+
+def _stroke_paint(stroke: dict | None) -> skia.Paint | None:
+    if not stroke or float(stroke.get('width', 0)) <= 0:
+        return None
+    return skia.Paint(
+        Color=_color(stroke.get('color', '#000000')),
+        AntiAlias=True,
+        Style=skia.Paint.kStroke_Style,
+        StrokeWidth=float(stroke['width']),
+        StrokeJoin=skia.Paint.kRound_Join,
+    )
+
+
+def _shadow_layer(placements: list[tuple[skia.TextBlob, float, float]], rect: skia.Rect, shadow: dict, stroke: skia.Paint | None) -> tuple[skia.Image, float, float]:
+    # The blur runs once here; the cached image is composited on every later frame.
+    blur = max(0.0, float(shadow.get('blur', 0)))
+    margin = math.ceil(blur * 1.5) + 1
+    surface = skia.Surface(int(math.ceil(rect.width())) + 2 * margin, int(math.ceil(rect.height())) + 2 * margin)
+    canvas = surface.getCanvas()
+    if blur > 0:
+        canvas.saveLayer(None, skia.Paint(ImageFilter=skia.ImageFilters.Blur(blur / 2, blur / 2)))
+    canvas.translate(margin - rect.left(), margin - rect.top())
+    paint = skia.Paint(Color=_color(shadow.get('color', '#80000000')), AntiAlias=True)
+    silhouette = None
+    if stroke is not None:
+        silhouette = skia.Paint(stroke)
+        silhouette.setColor(paint.getColor())
+    for blob, x, y in placements:
+        if silhouette is not None:
+            canvas.drawTextBlob(blob, x, y, silhouette)
+        canvas.drawTextBlob(blob, x, y, paint)
+    if blur > 0:
+        canvas.restore()
+    offset_x = float(shadow.get('offsetX', 0.0)) - margin
+    offset_y = float(shadow.get('offsetY', 4.0)) - margin
+    return surface.makeImageSnapshot(), offset_x, offset_y
+
+
+def _line_blob(line: str, font: skia.Font, letter_spacing: float, cache: RenderCache | None) -> tuple[skia.TextBlob | None, float]:
+    key = (line, font.getTypeface().getFamilyName(), font.getSize(), letter_spacing)
+    item = cache.blobs.get(key) if cache is not None else None
+    if item is None:
+        advances = measure_advances(line, font) + letter_spacing
+        xpos = np.concatenate(([0.0], np.cumsum(advances)[:-1]))
+        blob = skia.TextBlob.MakeFromPosTextH(line, xpos.tolist(), 0, font) if line else None
+        item = (blob, float(advances.sum() - letter_spacing) if line else 0.0)
+        if cache is not None:
+            cache.blobs[key] = item
+    return item
 
 
 def _layout_lines(text: str, font: skia.Font, width: float, letter_spacing: float, overflow: str) -> list[str]:
-    words = text.replace('\n', ' \n ').split()
     if overflow == 'clip':
         return [text]
 
+    # All words are measured from one glyph run; words a..b span
+    # ends[b + 1] - ends[a] - space - 2 * letter_spacing on one line.
+    words = [(m.start(), m.end()) for m in _WORD_RE.finditer(text)]
+    advances = np.concatenate(([0.0], np.cumsum(measure_advances(text, font))))
+    starts = np.fromiter((w[0] for w in words), dtype=np.intp, count=len(words))
+    stops = np.fromiter((w[1] for w in words), dtype=np.intp, count=len(words))
+    space = font.measureText(' ')
+    extents = advances[stops] - advances[starts] + (stops - starts + 1) * letter_spacing + space
+    ends = np.concatenate(([0.0], np.cumsum(extents)))
+    limit = width + space + 2 * letter_spacing
+
     lines: list[str] = []
-    current = ''
-    for word in words:
-        if word == '\n':
-            lines.append(current)
-            current = ''
-            continue
-        probe = word if not current else current + ' ' + word
-        measure = font.measureText(probe) + max(0, len(probe) - 1) * letter_spacing
-        if measure <= width or not current:
-            current = probe
-        else:
-            lines.append(current)
-            current = word
-    if current:
-        lines.append(current)
+    a = 0
+    while a < len(words):
+        b = int(np.searchsorted(ends, ends[a] + limit, side='right')) - 2
+        b = min(len(words) - 1, max(a, b))
+        lines.append(' '.join(text[start:stop] for start, stop in words[a:b + 1]))
+        a = b + 1
 
     if overflow == 'ellipsis' and lines:
         last = lines[-1]
-        while font.measureText(last + '…') > width and len(last) > 1:
-            last = last[:-1]
+        # Spaced like _line_blob: each kept glyph carries letter_spacing before the ellipsis.
+        widths = np.cumsum(measure_advances(last, font) + letter_spacing)
+        fits = np.flatnonzero(widths + font.measureText('…') <= width)
+        if len(last) > 1:
+            last = last[:int(fits[-1]) + 1 if fits.size else 1]
         lines[-1] = last + '…'
     return lines or ['']
 
 
+_WORD_RE = re.compile(r'\S+')
+
+
+@lru_cache(maxsize=1024)
 def _color(value: str) -> int:
     v = value.strip().lstrip('#')
     if len(v) == 6:
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import math
+import struct
+from contextlib import contextmanager
+from pathlib import Path
+
+from .models import ImageBlock, ImageRegion, Job, Slide, Template, TextBlock, TextRegion
+
+# Layout: header | string offsets | string data | row tables.
+# Strings are interned once; rows reference them by index (NONE for None).
+# The slide table stores (first text row, text count, first image row,
+# image count) so a single slide can be decoded without touching the rest.
+
+JOB_MAGIC = b'CGJ1'
+TEMPLATE_MAGIC = b'CGT1'
+NONE = 0xFFFFFFFF
+
+_HEADER = struct.Struct('<4sIIIIII')
+_SLIDE = struct.Struct('<IIII')
+_TEXT_BLOCK = struct.Struct('<IIIII')
+_IMAGE_BLOCK = struct.Struct('<IIIddd')
+_TEMPLATE = struct.Struct('<IIII')
+_TEXT_REGION = struct.Struct('<IiiiiiIIII')
+_IMAGE_REGION = struct.Struct('<IiiiiIddd')
+_CROP_KEYS = ('scale', 'offsetX', 'offsetY')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+@contextmanager
+def _decoding():
+    try:
+        yield
+    except (struct.error, UnicodeDecodeError) as exc:
+        raise SnapshotError('Файл снимка повреждён') from exc
+
+
+class _StringTable:
+    def __init__(self):
+        self.index: dict[str, int] = {}
+        self.values: list[str] = []
+
+    def ref(self, value: str | None) -> int:
+        if value is None:
+            return NONE
+        idx = self.index.get(value)
+        if idx is None:
+            idx = self.index[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+    def pack(self) -> bytes:
+        data = [x.encode('utf-8') for x in self.values]
+        offsets = [0]
+        for item in data:
+            offsets.append(offsets[-1] + len(item))
+        return struct.pack(f'<{len(offsets)}I', *offsets) + b''.join(data)
+
+
+class _Reader:
+    def __init__(self, data: bytes, magic: bytes):
+        if len(data) < _HEADER.size:
+            raise SnapshotError('Файл снимка повреждён')
+        self.data = memoryview(data)
+        header = _HEADER.unpack_from(self.data, 0)
+        if header[0] != magic:
+            raise SnapshotError('Неизвестный формат снимка')
+        self.counts = header[1:]
+        self.string_count = header[1]
+        self.offsets_at = _HEADER.size
+        self.strings_at = self.offsets_at + 4 * (self.string_count + 1)
+        with _decoding():
+            self.rows_at = self.strings_at + struct.unpack_from('<I', self.data, self.offsets_at + 4 * self.string_count)[0]
+        self._strings: dict[int, str] = {}
+
+    def string(self, idx: int) -> str | None:
+        if idx == NONE:
+            return None
+        value = self._strings.get(idx)
+        if value is None:
+            with _decoding():
+                start, stop = struct.unpack_from('<II', self.data, self.offsets_at + 4 * idx)
+                value = self._strings[idx] = str(self.data[self.strings_at + start:self.strings_at + stop], 'utf-8')
+        return value
+
+
+def dump_job(job: Job) -> bytes:
+    strings = _StringTable()
+    name, template = strings.ref(job.name), strings.ref(job.template)
+    slides, texts, images = [], [], []
+    for slide in job.slides:
+        slides.append(_SLIDE.pack(len(texts), len(slide.textBlocks), len(images), len(slide.imageBlocks)))
+        for block in slide.textBlocks:
+            texts.append(_TEXT_BLOCK.pack(strings.ref(block.region), strings.ref(block.text), strings.ref(block.style), strings.ref(block.align), strings.ref(block.color)))
+        for block in slide.imageBlocks:
+            images.append(_IMAGE_BLOCK.pack(strings.ref(block.region), strings.ref(block.path), strings.ref(block.fit), *_pack_crop(block.crop)))
+    header = _HEADER.pack(JOB_MAGIC, len(strings.values), name, template, len(slides), len(texts), len(images))
+    return b''.join([header, strings.pack(), *slides, *texts, *images])
+
+
+class JobSnapshot:
+    def __init__(self, data: bytes):
+        self._reader = _Reader(data, JOB_MAGIC)
+        _, name, template, self.slide_count, self.text_count, self.image_count = self._reader.counts
+        self.name = self._reader.string(name)
+        self.template = self._reader.string(template)
+        self._slides_at = self._reader.rows_at
+        self._texts_at = self._slides_at + _SLIDE.size * self.slide_count
+        self._images_at = self._texts_at + _TEXT_BLOCK.size * self.text_count
+
+    def __len__(self) -> int:
+        return self.slide_count
+
+    def slide(self, index: int) -> Slide:
+        if not 0 <= index < self.slide_count:
+            raise IndexError(index)
+        reader = self._reader
+        slide = Slide()
+        with _decoding():
+            text_start, text_count, image_start, image_count = _SLIDE.unpack_from(reader.data, self._slides_at + _SLIDE.size * index)
+            for row in range(text_start, text_start + text_count):
+                region, text, style, align, color = _TEXT_BLOCK.unpack_from(reader.data, self._texts_at + _TEXT_BLOCK.size * row)
+                slide.textBlocks.append(TextBlock(region=reader.string(region), text=reader.string(text), style=reader.string(style), align=reader.string(align), color=reader.string(color)))
+            for row in range(image_start, image_start + image_count):
+                region, path, fit, *crop = _IMAGE_BLOCK.unpack_from(reader.data, self._images_at + _IMAGE_BLOCK.size * row)
+                slide.imageBlocks.append(ImageBlock(region=reader.string(region), path=reader.string(path), fit=reader.string(fit), crop=_unpack_crop(crop)))
+        return slide
+
+    def to_job(self) -> Job:
+        return Job(name=self.name, template=self.template, slides=[self.slide(i) for i in range(self.slide_count)])
+
+
+def load_job_bytes(data: bytes) -> Job:
+    return JobSnapshot(data).to_job()
+
+
+def open_job_snapshot(path: Path) -> JobSnapshot:
+    return JobSnapshot(path.read_bytes())
+
+
+def dump_template(template: Template) -> bytes:
+    strings = _StringTable()
+    name = strings.ref(template.name)
+    # Geometry is stored as integer pixels; JSON templates may carry floats such as 80.0.
+    head = _TEMPLATE.pack(_px(template.width), _px(template.height), strings.ref(template.background), 0)
+    texts = [
+        _TEXT_REGION.pack(strings.ref(r.name), _px(r.x), _px(r.y), _px(r.width), _px(r.height), _px(r.padding), strings.ref(r.overflow), strings.ref(r.align), strings.ref(r.valign), strings.ref(r.defaultStyle))
+        for r in template.textRegions
+    ]
+    images = [
+        _IMAGE_REGION.pack(strings.ref(r.name), _px(r.x), _px(r.y), _px(r.width), _px(r.height), strings.ref(r.fit), *_pack_crop(r.defaultCrop))
+        for r in template.imageRegions
+    ]
+    header = _HEADER.pack(TEMPLATE_MAGIC, len(strings.values), name, len(texts), len(images), 0, 0)
+    return b''.join([header, strings.pack(), head, *texts, *images])
+
+
+def load_template_bytes(data: bytes) -> Template:
+    reader = _Reader(data, TEMPLATE_MAGIC)
+    with _decoding():
+        return _read_template(reader)
+
+
+def _read_template(reader: _Reader) -> Template:
+    _, name, text_count, image_count, _, _ = reader.counts
+    width, height, background, _ = _TEMPLATE.unpack_from(reader.data, reader.rows_at)
+    template = Template(name=reader.string(name), width=width, height=height, background=reader.string(background))
+    at = reader.rows_at + _TEMPLATE.size
+    for _ in range(text_count):
+        name_ref, x, y, w, h, padding, overflow, align, valign, style = _TEXT_REGION.unpack_from(reader.data, at)
+        template.textRegions.append(TextRegion(
+            name=reader.string(name_ref), x=x, y=y, width=w, height=h, padding=padding,
+            overflow=reader.string(overflow), align=reader.string(align), valign=reader.string(valign), defaultStyle=reader.string(style),
+        ))
+        at += _TEXT_REGION.size
+    for _ in range(image_count):
+        name_ref, x, y, w, h, fit, *crop = _IMAGE_REGION.unpack_from(reader.data, at)
+        template.imageRegions.append(ImageRegion(name=reader.string(name_ref), x=x, y=y, width=w, height=h, fit=reader.string(fit), defaultCrop=_unpack_crop(crop)))
+        at += _IMAGE_REGION.size
+    return template
+
+
+def _px(value: float) -> int:
+    return int(round(value))
+
+
+def _pack_crop(crop: dict[str, float] | None) -> list[float]:
+    crop = crop or {}
+    return [float(crop[k]) if k in crop else math.nan for k in _CROP_KEYS]
+
+
+def _unpack_crop(values: list[float]) -> dict[str, float]:
+    return {k: v for k, v in zip(_CROP_KEYS, values) if not math.isnan(v)}
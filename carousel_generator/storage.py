@@ -3,7 +3,12 @@ from __future__ import annotations
 import json
 from pathlib import Path
 
+from .memory import DEFAULT_BUDGET_MB
 from .models import Job, Template, TextStyle, job_from_dict, template_from_dict, to_dict
+from .snapshot import dump_job, dump_template, load_job_bytes, load_template_bytes
+
+
+DEFAULT_SETTINGS = {'lastTemplate': 'carousel_default', 'lastJob': 'job_default', 'memoryBudgetMB': DEFAULT_BUDGET_MB, 'startupTrace': False, 'storageFormat': 'json'}
 
 
 def ensure_project(project_dir: Path) -> None:
@@ -11,7 +16,13 @@ def ensure_project(project_dir: Path) -> None:
         (project_dir / folder).mkdir(parents=True, exist_ok=True)
     settings = project_dir / 'settings.json'
     if not settings.exists():
-        settings.write_text(json.dumps({'lastTemplate': 'carousel_default', 'lastJob': 'job_default'}, ensure_ascii=False, indent=2), encoding='utf-8')
+        _write_json(settings, DEFAULT_SETTINGS)
+
+
+def load_settings(project_dir: Path) -> dict:
+    path = project_dir / 'settings.json'
+    raw = _read_json(path) if path.exists() else {}
+    return {**DEFAULT_SETTINGS, **raw}
 
 
 def _read_json(path: Path) -> dict:
@@ -22,38 +33,49 @@ def _write_json(path: Path, data: dict) -> None:
     path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
 
 
-def template_path(project_dir: Path, name: str) -> Path:
-    return project_dir / 'templates' / f'{name}.json'
+def template_path(project_dir: Path, name: str, fmt: str = 'json') -> Path:
+    return project_dir / 'templates' / f'{name}.{"cgt" if fmt == "binary" else "json"}'
 
 
 def style_path(project_dir: Path, name: str) -> Path:
     return project_dir / 'styles' / f'{name}.json'
 
 
-def job_path(project_dir: Path, name: str) -> Path:
-    return project_dir / 'jobs' / f'{name}.json'
+def job_path(project_dir: Path, name: str, fmt: str = 'json') -> Path:
+    return project_dir / 'jobs' / f'{name}.{"cgj" if fmt == "binary" else "json"}'
+
+
+def _newest(*paths: Path) -> Path | None:
+    existing = [x for x in paths if x.exists()]
+    return max(existing, key=lambda x: x.stat().st_mtime_ns) if existing else None
 
 
 def load_template(project_dir: Path, name: str) -> Template:
-    path = template_path(project_dir, name)
-    if not path.exists():
-        tpl = Template(
-            name=name,
-            textRegions=[
+    path = _newest(template_path(project_dir, name), template_path(project_dir, name, 'binary'))
+    if path is None:
+        tpl = template_from_dict({
+            'name': name,
+            'textRegions': [
                 {'name': 'hero', 'x': 80, 'y': 80, 'width': 920, 'height': 260, 'padding': 12, 'overflow': 'shrink-to-fit', 'align': 'center', 'valign': 'middle', 'defaultStyle': 'H1'},
                 {'name': 'sub', 'x': 80, 'y': 360, 'width': 920, 'height': 220, 'padding': 10, 'overflow': 'wrap', 'align': 'left', 'valign': 'top', 'defaultStyle': 'H2'},
             ],
-            imageRegions=[
+            'imageRegions': [
                 {'name': 'main', 'x': 80, 'y': 620, 'width': 920, 'height': 650, 'fit': 'cover', 'defaultCrop': {'scale': 1.0, 'offsetX': 0.0, 'offsetY': 0.0}},
             ],
-        )
+        })
         save_template(project_dir, tpl)
         return tpl
+    if path.suffix == '.cgt':
+        return load_template_bytes(path.read_bytes())
     return template_from_dict(_read_json(path))
 
 
-def save_template(project_dir: Path, template: Template) -> None:
-    _write_json(template_path(project_dir, template.name), to_dict(template))
+def save_template(project_dir: Path, template: Template, fmt: str | None = None) -> None:
+    fmt = fmt or load_settings(project_dir)['storageFormat']
+    if fmt == 'binary':
+        template_path(project_dir, template.name, fmt).write_bytes(dump_template(template))
+    else:
+        _write_json(template_path(project_dir, template.name), to_dict(template))
 
 
 def load_styles(project_dir: Path) -> dict[str, TextStyle]:
@@ -78,13 +100,27 @@ def save_styles(project_dir: Path, styles: dict[str, TextStyle]) -> None:
 
 
 def load_job(project_dir: Path, name: str, template_name: str) -> Job:
-    path = job_path(project_dir, name)
-    if not path.exists():
+    path = _newest(job_path(project_dir, name), job_path(project_dir, name, 'binary'))
+    if path is None:
         job = Job(name=name, template=template_name, slides=[])
         save_job(project_dir, job)
         return job
+    if path.suffix == '.cgj':
+        return load_job_bytes(path.read_bytes())
+    return job_from_dict(_read_json(path))
+
+
+def save_job(project_dir: Path, job: Job, fmt: str | None = None) -> None:
+    fmt = fmt or load_settings(project_dir)['storageFormat']
+    if fmt == 'binary':
+        job_path(project_dir, job.name, fmt).write_bytes(dump_job(job))
+    else:
+        _write_json(job_path(project_dir, job.name), to_dict(job))
+
+
+def import_job_json(path: Path) -> Job:
     return job_from_dict(_read_json(path))
 
 
-def save_job(project_dir: Path, job: Job) -> None:
-    _write_json(job_path(project_dir, job.name), to_dict(job))
+def export_job_json(job: Job, path: Path) -> None:
+    _write_json(path, to_dict(job))
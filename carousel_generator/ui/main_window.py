@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import copy
+import threading
 from datetime import datetime
 from pathlib import Path
 
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import QThread, Qt, QTimer, Signal
 from PySide6.QtGui import QImage, QPixmap
 from PySide6.QtWidgets import (
     QComboBox,
@@ -20,29 +22,59 @@ from PySide6.QtWidgets import (
     QMessageBox,
     QPushButton,
     QPlainTextEdit,
+    QProgressBar,
     QSlider,
     QSpinBox,
+    QTableWidget,
+    QTableWidgetItem,
     QTabWidget,
     QTextEdit,
     QVBoxLayout,
     QWidget,
 )
 
-from ..models import ImageBlock, Job, Slide, Template, TextBlock, TextStyle
-from ..renderer import export_job, image_to_png_bytes, render_slide
+import skia
+
+from ..merge import export_merge
+from ..memory import MemoryBudget, MemoryCache, default_budget
+from ..models import ImageBlock, ImageRegion, Job, Slide, Template, TextBlock, TextStyle
+from ..renderer import RenderCache, RenderContext, compile_template, image_nbytes, image_to_png_bytes, iter_export_job, make_proxy, render_image_proxy, render_slide, slide_fingerprint
 from ..script_parser import parse_script, to_script
-from ..storage import save_job
+from ..storage import export_job_json, import_job_json, save_job
+
+
+_QIMAGE_FORMATS = {
+    (skia.kBGRA_8888_ColorType, skia.kPremul_AlphaType): QImage.Format_ARGB32_Premultiplied,
+    (skia.kBGRA_8888_ColorType, skia.kUnpremul_AlphaType): QImage.Format_ARGB32,
+    (skia.kRGBA_8888_ColorType, skia.kPremul_AlphaType): QImage.Format_RGBA8888_Premultiplied,
+    (skia.kRGBA_8888_ColorType, skia.kUnpremul_AlphaType): QImage.Format_RGBA8888,
+}
+
+
+def _to_qimage(image: skia.Image) -> QImage:
+    fmt = _QIMAGE_FORMATS.get((image.colorType(), image.alphaType()))
+    if fmt is None:
+        return QImage.fromData(image_to_png_bytes(image), 'PNG')
+    return QImage(image.tobytes(), image.width(), image.height(), image.width() * 4, fmt).copy()
 
 
 class CropDialog(QDialog):
     crop_changed = Signal(dict)
 
-    def __init__(self, crop: dict[str, float], parent=None):
+    def __init__(self, crop: dict[str, float], parent=None, proxy: skia.Image | None = None, region: ImageRegion | None = None, fit: str = 'cover'):
         super().__init__(parent)
         self.setWindowTitle('Обрезка изображения')
         self.crop = dict(crop)
+        self.region = region
+        self.fit = fit
+        self.proxy = proxy if region is not None else None
         layout = QFormLayout(self)
 
+        self.preview = QLabel()
+        self.preview.setAlignment(Qt.AlignCenter)
+        if self.proxy is not None:
+            layout.addRow(self.preview)
+
         self.scale = QSlider(Qt.Horizontal)
         self.scale.setRange(50, 250)
         self.scale.setValue(int(self.crop.get('scale', 1.0) * 100))
@@ -56,34 +88,138 @@ class CropDialog(QDialog):
         layout.addRow('Сдвиг X', self.offset_x)
         layout.addRow('Сдвиг Y', self.offset_y)
 
+        self.wheel_timer = QTimer(self)
+        self.wheel_timer.setSingleShot(True)
+        self.wheel_timer.setInterval(250)
+        self.wheel_timer.timeout.connect(self._emit)
+
         for widget in [self.scale, self.offset_x, self.offset_y]:
-            widget.valueChanged.connect(self._emit)
+            widget.valueChanged.connect(self._on_value_changed)
+            widget.sliderReleased.connect(self._emit)
 
         ok = QPushButton('Готово')
         ok.clicked.connect(self.accept)
         layout.addRow(ok)
+        self._render_proxy()
 
     def wheelEvent(self, event):
         step = 5 if event.angleDelta().y() > 0 else -5
         self.scale.setValue(max(self.scale.minimum(), min(self.scale.maximum(), self.scale.value() + step)))
 
-    def _emit(self):
+    def done(self, result):
+        if self.wheel_timer.isActive():
+            self._emit()
+        super().done(result)
+
+    def _on_value_changed(self):
         self.crop = {
             'scale': self.scale.value() / 100,
             'offsetX': self.offset_x.value() / 100,
             'offsetY': self.offset_y.value() / 100,
         }
+        self._render_proxy()
+        # Wheel ticks over a slider never reach wheelEvent, so every change
+        # outside a drag is debounced here; a drag commits on release.
+        if not any(w.isSliderDown() for w in [self.scale, self.offset_x, self.offset_y]):
+            self.wheel_timer.start()
+
+    def _render_proxy(self):
+        if self.proxy is None:
+            return
+        scale = min(480 / self.region.width, 480 / self.region.height)
+        image = render_image_proxy(self.proxy, self.region, self.fit, self.crop, scale)
+        self.preview.setPixmap(QPixmap.fromImage(_to_qimage(image)))
+
+    def _emit(self):
+        self.wheel_timer.stop()
         self.crop_changed.emit(self.crop)
 
 
+class ExportWorker(QThread):
+    progress = Signal(int, int)
+    warning = Signal(str)
+    failed = Signal(str)
+    done = Signal(bool)
+
+    def __init__(self, template: Template, styles: dict[str, TextStyle], job: Job, output_dir: Path, fmt: str = 'png', data_path: Path | None = None):
+        super().__init__()
+        self.template = copy.deepcopy(template)
+        self.styles = copy.deepcopy(styles)
+        self.job = copy.deepcopy(job)
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.data_path = data_path
+        self.cancel_event = threading.Event()
+        self.warning_count = 0
+        self.count = 0
+        self.error: str | None = None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            if self.data_path is not None:
+                events = export_merge(self.template, self.styles, self.job, self.data_path, self.output_dir, fmt=self.fmt, cancel=self.cancel_event)
+            else:
+                events = iter_export_job(self.template, self.styles, self.job, self.output_dir, fmt=self.fmt, cancel=self.cancel_event)
+            for event in events:
+                self.count = event.index
+                for w in event.warnings:
+                    self.warning_count += 1
+                    self.warning.emit(w)
+                self.progress.emit(event.index, event.total)
+        except Exception as exc:
+            self.error = f'{type(exc).__name__}: {exc}'
+            self.failed.emit(self.error)
+        finally:
+            self.done.emit(self.cancel_event.is_set())
+
+
+class MemoryDialog(QDialog):
+    def __init__(self, budget: MemoryBudget, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Память')
+        self.resize(480, 320)
+        self.budget = budget
+        layout = QVBoxLayout(self)
+        self.total = QLabel()
+        self.table = QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(['Кэш', 'Записей', 'МБ'])
+        self.table.horizontalHeader().setStretchLastSection(True)
+        refresh = QPushButton('Обновить')
+        refresh.clicked.connect(self._refresh)
+        layout.addWidget(self.total)
+        layout.addWidget(self.table, 1)
+        layout.addWidget(refresh)
+        self._refresh()
+
+    def _refresh(self):
+        usage = sorted(self.budget.usage().items())
+        self.table.setRowCount(len(usage))
+        for row, (name, (entries, nbytes)) in enumerate(usage):
+            self.table.setItem(row, 0, QTableWidgetItem(name))
+            self.table.setItem(row, 1, QTableWidgetItem(str(entries)))
+            self.table.setItem(row, 2, QTableWidgetItem(f'{nbytes / 1024 / 1024:.1f}'))
+        self.total.setText(f'Всего: {self.budget.total_bytes / 1024 / 1024:.1f} МБ из {self.budget.limit_bytes / 1024 / 1024:.0f} МБ')
+
+
 class MainWindow(QMainWindow):
-    def __init__(self, project_dir: Path, template: Template, styles: dict[str, TextStyle], job: Job):
+    def __init__(self, project_dir: Path, template: Template, styles: dict[str, TextStyle], job: Job, render_cache: RenderCache | None = None, storage_format: str = 'json'):
         super().__init__()
         self.project_dir = project_dir
+        self.storage_format = storage_format
         self.template = template
         self.styles = styles
         self.job = job
         self.current_slide = 0
+        self.render_context = RenderContext(skia.kN32_ColorType, skia.kPremul_AlphaType)
+        self.compiled = compile_template(template, styles)
+        self.render_cache = render_cache or RenderCache()
+        # QImage, not QPixmap: the export thread's caches share this budget and may evict from it.
+        self.preview_cache = MemoryCache('ui.previews', lambda item: item[0].sizeInBytes())
+        self.proxy_cache = MemoryCache('ui.crop_proxies', image_nbytes)
+        self.export_worker: ExportWorker | None = None
 
         self.setWindowTitle('Carousel Generator')
         self.resize(1500, 900)
@@ -181,12 +317,27 @@ class MainWindow(QMainWindow):
         self.zoom.setRange(10, 300)
         self.zoom.setValue(50)
         self.zoom.valueChanged.connect(self._render_preview)
-        generate = QPushButton('Сгенерировать')
-        generate.clicked.connect(self._generate)
+        self.generate_btn = QPushButton('Сгенерировать')
+        self.generate_btn.clicked.connect(self._generate)
+        self.export_progress = QProgressBar()
+        self.export_progress.setVisible(False)
+        self.merge_btn = QPushButton('Слияние данных...')
+        self.merge_btn.clicked.connect(self._generate_merge)
+        self.cancel_btn = QPushButton('Отмена')
+        self.cancel_btn.setVisible(False)
+        self.cancel_btn.clicked.connect(self._cancel_export)
+        export_row = QHBoxLayout()
+        export_row.addWidget(self.export_progress, 1)
+        export_row.addWidget(self.cancel_btn)
+        memory = QPushButton('Память')
+        memory.clicked.connect(lambda: MemoryDialog(default_budget, self).exec())
         right.addWidget(QLabel('Preview'))
         right.addWidget(self.preview, 1)
         right.addWidget(self.zoom)
-        right.addWidget(generate)
+        right.addWidget(self.generate_btn)
+        right.addWidget(self.merge_btn)
+        right.addLayout(export_row)
+        right.addWidget(memory)
         self.warnings = QPlainTextEdit()
         self.warnings.setReadOnly(True)
         right.addWidget(self.warnings)
@@ -200,8 +351,16 @@ class MainWindow(QMainWindow):
         self.script = QPlainTextEdit()
         apply_btn = QPushButton('Импортировать сценарий')
         apply_btn.clicked.connect(self._apply_script)
+        json_row = QHBoxLayout()
+        import_json = QPushButton('Импорт JSON...')
+        import_json.clicked.connect(self._import_json)
+        export_json = QPushButton('Экспорт JSON...')
+        export_json.clicked.connect(self._export_json)
+        json_row.addWidget(import_json)
+        json_row.addWidget(export_json)
         layout.addWidget(self.script)
         layout.addWidget(apply_btn)
+        layout.addLayout(json_row)
         return root
 
     def _refresh_all(self):
@@ -261,8 +420,6 @@ class MainWindow(QMainWindow):
         self._refresh_all()
 
     def _duplicate_slide(self):
-        import copy
-
         self.job.slides.insert(self.current_slide + 1, copy.deepcopy(self._slide()))
         self._refresh_all()
 
@@ -308,10 +465,22 @@ class MainWindow(QMainWindow):
         block = self._selected_block()
         if not isinstance(block, ImageBlock):
             return
-        dlg = CropDialog(block.crop, self)
+        region = next((x for x in self.template.imageRegions if x.name == block.region), None)
+        dlg = CropDialog(block.crop, self, self._crop_proxy(block.path), region, block.fit or (region.fit if region else 'cover'))
         dlg.crop_changed.connect(lambda c: self._set_crop(c))
         dlg.exec()
 
+    def _crop_proxy(self, path: str) -> skia.Image | None:
+        if not path or not Path(path).exists():
+            return None
+        st = Path(path).stat()
+        key = (path, st.st_mtime_ns, st.st_size)
+        proxy = self.proxy_cache.get(key)
+        if proxy is None:
+            proxy = make_proxy(skia.Image.open(path))
+            self.proxy_cache[key] = proxy
+        return proxy
+
     def _set_crop(self, crop):
         block = self._selected_block()
         if isinstance(block, ImageBlock):
@@ -334,7 +503,7 @@ class MainWindow(QMainWindow):
         self._save()
 
     def _save(self):
-        save_job(self.project_dir, self.job)
+        save_job(self.project_dir, self.job, self.storage_format)
         self.script.setPlainText(to_script(self.job))
         self._render_preview()
 
@@ -346,25 +515,103 @@ class MainWindow(QMainWindow):
         if parsed:
             parsed.name = self.job.name
             self.job = parsed
-            save_job(self.project_dir, self.job)
+            save_job(self.project_dir, self.job, self.storage_format)
             self.warnings.setPlainText('')
             self._refresh_all()
 
+    def _import_json(self):
+        path, _ = QFileDialog.getOpenFileName(self, 'Импорт задания', str(self.project_dir / 'jobs'), 'JSON (*.json)')
+        if not path:
+            return
+        try:
+            imported = import_job_json(Path(path))
+        except (OSError, ValueError, TypeError, KeyError, AttributeError) as exc:
+            QMessageBox.critical(self, 'Ошибка импорта', f'{type(exc).__name__}: {exc}')
+            return
+        imported.name = self.job.name
+        self.job = imported
+        self.current_slide = 0
+        save_job(self.project_dir, self.job, self.storage_format)
+        self._refresh_all()
+
+    def _export_json(self):
+        path, _ = QFileDialog.getSaveFileName(self, 'Экспорт задания', str(self.project_dir / 'output' / f'{self.job.name}.json'), 'JSON (*.json)')
+        if path:
+            export_job_json(self.job, Path(path))
+
     def _render_preview(self):
         if not self.job.slides:
             return
-        image, warnings = render_slide(self.template, self.styles, self._slide())
-        png = image_to_png_bytes(image)
-        qimage = QImage.fromData(png, 'PNG')
-        if qimage.isNull():
-            return
-        scale = self.zoom.value() / 100
-        pix = QPixmap.fromImage(qimage).scaled(int(self.template.width * scale), int(self.template.height * scale), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.preview.setPixmap(pix)
+        key = (slide_fingerprint(self.compiled, self._slide()), self.zoom.value())
+        cached = self.preview_cache.get(key)
+        if cached is None:
+            image, warnings = render_slide(self.compiled, self.styles, self._slide(), self.render_cache, self.render_context)
+            qimage = _to_qimage(image)
+            if qimage.isNull():
+                return
+            scale = self.zoom.value() / 100
+            scaled = qimage.scaled(int(self.template.width * scale), int(self.template.height * scale), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            cached = (scaled, warnings)
+            self.preview_cache[key] = cached
+        scaled, warnings = cached
+        self.preview.setPixmap(QPixmap.fromImage(scaled))
         self.warnings.setPlainText('\n'.join(warnings))
 
     def _generate(self):
         timestamp = datetime.now().strftime('%Y%m%d_%H%M')
         base = self.project_dir / 'output' / f'{self.job.name}_{timestamp}'
-        warnings = export_job(self.template, self.styles, self.job, base, fmt='png')
-        QMessageBox.information(self, 'Готово', f'Слайды экспортированы: {base}\nПредупреждений: {len(warnings)}')
+        self._start_export(ExportWorker(self.template, self.styles, self.job, base, fmt='png'), len(self.job.slides))
+
+    def _generate_merge(self):
+        path, _ = QFileDialog.getOpenFileName(self, 'Данные для слияния', str(self.project_dir / 'assets'), 'Data (*.csv *.jsonl *.ndjson)')
+        if not path:
+            return
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M')
+        base = self.project_dir / 'output' / f'{self.job.name}_merge_{timestamp}'
+        self._start_export(ExportWorker(self.template, self.styles, self.job, base, fmt='png', data_path=Path(path)), 0)
+
+    def _start_export(self, worker: ExportWorker, total: int):
+        self.export_worker = worker
+        worker.progress.connect(self._on_export_progress)
+        worker.warning.connect(self.warnings.appendPlainText)
+        worker.failed.connect(self.warnings.appendPlainText)
+        worker.done.connect(self._on_export_done)
+        self.export_progress.setRange(0, total)
+        self.export_progress.setValue(0)
+        self.export_progress.setVisible(True)
+        self.cancel_btn.setVisible(True)
+        self.generate_btn.setEnabled(False)
+        self.merge_btn.setEnabled(False)
+        self.warnings.clear()
+        worker.start()
+
+    def closeEvent(self, event):
+        if self.export_worker is not None:
+            self.export_worker.cancel()
+            self.export_worker.wait()
+        super().closeEvent(event)
+
+    def _cancel_export(self):
+        if self.export_worker is not None:
+            self.export_worker.cancel()
+
+    def _on_export_progress(self, index: int, total: int):
+        self.export_progress.setValue(index)
+
+    def _on_export_done(self, cancelled: bool):
+        worker, self.export_worker = self.export_worker, None
+        worker.wait()
+        self.export_progress.setVisible(False)
+        self.cancel_btn.setVisible(False)
+        self.generate_btn.setEnabled(True)
+        self.merge_btn.setEnabled(True)
+        if worker.error is not None:
+            QMessageBox.critical(self, 'Ошибка экспорта', f'{worker.error}\nГотово: {worker.count}\nПапка: {worker.output_dir}')
+            return
+        if cancelled:
+            QMessageBox.information(self, 'Отменено', f'Экспорт остановлен: {worker.output_dir}')
+            return
+        if worker.data_path is not None:
+            QMessageBox.information(self, 'Готово', f'Карусели экспортированы: {worker.count}\nПапка: {worker.output_dir}\nПредупреждений: {worker.warning_count}')
+            return
+        QMessageBox.information(self, 'Готово', f'Слайды экспортированы: {worker.output_dir}\nПредупреждений: {worker.warning_count}')
@@ -1,5 +1,8 @@
+from multiprocessing import freeze_support
+
 from carousel_generator.app import main
 
 
 if __name__ == '__main__':
+    freeze_support()
     main()
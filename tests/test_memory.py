@@ -0,0 +1,24 @@
+from carousel_generator.memory import MemoryBudget, MemoryCache
+
+
+def test_budget_evicts_least_recently_used_across_caches():
+    budget = MemoryBudget(100)
+    images = MemoryCache('images', len, budget)
+    previews = MemoryCache('previews', len, budget)
+    images['a'] = b'x' * 40
+    previews['b'] = b'x' * 40
+    images.get('a')
+    previews['c'] = b'x' * 40
+    assert 'a' in images
+    assert 'b' not in previews
+    assert budget.usage() == {'images': (1, 40), 'previews': (1, 40)}
+    assert budget.total_bytes == 80
+
+
+def test_closed_cache_releases_its_bytes():
+    budget = MemoryBudget(1000)
+    cache = MemoryCache('layers', len, budget)
+    cache['a'] = b'x' * 10
+    cache.close()
+    assert budget.total_bytes == 0
+    assert budget.usage() == {}
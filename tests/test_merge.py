@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from carousel_generator.merge import export_merge, iter_rows, merge_job
+from carousel_generator.models import ImageBlock, Job, Slide, Template, TextBlock, TextRegion, TextStyle
+
+
+def _job():
+    return Job(name='promo', slides=[
+        Slide(textBlocks=[TextBlock(region='hero', text='{title}')], imageBlocks=[ImageBlock(region='main', path='assets/{sku}.jpg')]),
+        Slide(textBlocks=[TextBlock(region='hero', text='Цена: {price} {currency}')]),
+    ])
+
+
+def test_iter_rows_reads_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / 'rows.csv'
+    csv_path.write_text('title,price\nПервый,100\nВторой,200\n', encoding='utf-8')
+    jsonl_path = tmp_path / 'rows.jsonl'
+    jsonl_path.write_text('{"title": "Первый", "price": 100}\n\n{"title": "Второй", "price": 200}\n', encoding='utf-8')
+    assert [r['title'] for r in iter_rows(csv_path)] == ['Первый', 'Второй']
+    assert [r['price'] for r in iter_rows(jsonl_path)] == [100, 200]
+
+
+def test_iter_rows_names_the_bad_jsonl_line(tmp_path):
+    path = tmp_path / 'rows.jsonl'
+    path.write_text('{"title": "Первый"}\n{"title": \n', encoding='utf-8')
+    with pytest.raises(ValueError, match='Строка 2'):
+        list(iter_rows(path))
+    path.write_text('{"title": "Первый"}\n\n["Второй"]\n', encoding='utf-8')
+    with pytest.raises(ValueError, match='Строка 3: ожидался объект'):
+        list(iter_rows(path))
+
+
+def test_merge_job_fills_placeholders_and_reports_missing():
+    job = _job()
+    merged, warnings = merge_job(job, {'title': 'Кроссовки', 'sku': 'A1', 'price': 4990}, 'promo_00001')
+    assert merged.name == 'promo_00001'
+    assert merged.slides[0].textBlocks[0].text == 'Кроссовки'
+    assert merged.slides[0].imageBlocks[0].path == 'assets/A1.jpg'
+    assert merged.slides[1].textBlocks[0].text == 'Цена: 4990 {currency}'
+    assert warnings == ['Нет значения для {currency}']
+    assert job.slides[0].textBlocks[0].text == '{title}'
+
+
+def test_export_merge_renders_each_row_in_parallel(tmp_path):
+    data = tmp_path / 'rows.jsonl'
+    data.write_text('\n'.join(json.dumps({'title': f't{i}', 'sku': 'x', 'price': i, 'currency': '₽'}) for i in range(5)), encoding='utf-8')
+    template = Template(textRegions=[TextRegion(name='hero', x=80, y=80, width=920, height=260, defaultStyle='H1')])
+    events = list(export_merge(template, {'H1': TextStyle(name='H1')}, _job(), data, tmp_path / 'out', workers=2))
+    assert [e.path.name for e in events] == [f'promo_{i:05}' for i in range(1, 6)]
+    assert all((e.path / 'slide_02.png').exists() for e in events)
@@ -0,0 +1,203 @@
+import os
+import threading
+
+import skia
+
+from carousel_generator.models import ImageBlock, ImageRegion, Job, Slide, Template, TextBlock, TextRegion, TextStyle
+from carousel_generator.renderer import RenderCache, RenderContext, compile_template, export_job, iter_export_job, layout_job_text, layout_text, make_proxy, measure_advances, render_image_proxy, render_slide, slide_fingerprint
+
+
+def _template():
+    return Template(textRegions=[
+        TextRegion(name='hero', x=80, y=80, width=920, height=260, defaultStyle='H1'),
+        TextRegion(name='footer', x=80, y=1200, width=920, height=80, defaultStyle='H1'),
+    ])
+
+
+def _styles():
+    return {'H1': TextStyle(name='H1', fontSize=48)}
+
+
+def test_render_cache_reuses_region_layers():
+    template = _template()
+    cache = RenderCache()
+    first = Slide(textBlocks=[TextBlock(region='hero', text='one'), TextBlock(region='footer', text='@brand')])
+    second = Slide(textBlocks=[TextBlock(region='hero', text='two'), TextBlock(region='footer', text='@brand')])
+    render_slide(template, _styles(), first, cache)
+    render_slide(template, _styles(), second, cache)
+    assert len(cache.layers) == 3
+
+
+def test_export_job_encodes_identical_slides_once(tmp_path):
+    template = _template()
+    slide = Slide(textBlocks=[TextBlock(region='hero', text='same')])
+    job = Job(slides=[slide, Slide(textBlocks=[TextBlock(region='hero', text='same')]), Slide(textBlocks=[TextBlock(region='hero', text='other')])])
+    assert slide_fingerprint(template, job.slides[0]) == slide_fingerprint(template, job.slides[1])
+    warnings = export_job(template, {}, job, tmp_path)
+    assert (tmp_path / 'slide_01.png').read_bytes() == (tmp_path / 'slide_02.png').read_bytes()
+    assert (tmp_path / 'slide_01.png').read_bytes() != (tmp_path / 'slide_03.png').read_bytes()
+    assert [w[:9] for w in warnings] == ['[slide 1]', '[slide 2]', '[slide 3]']
+
+
+def test_crop_proxy_renders_scaled_region():
+    surface = skia.Surface(4000, 3000)
+    surface.getCanvas().clear(0xFF336699)
+    proxy = make_proxy(surface.makeImageSnapshot(), max_side=800)
+    assert (proxy.width(), proxy.height()) == (800, 600)
+    region = ImageRegion(name='main', x=80, y=620, width=920, height=650)
+    image = render_image_proxy(proxy, region, 'cover', {'scale': 1.5, 'offsetX': 0.2, 'offsetY': 0.0}, 0.5)
+    assert (image.width(), image.height()) == (460, 325)
+
+
+def test_render_context_reuses_surfaces_in_requested_format():
+    context = RenderContext(skia.kRGBA_8888_ColorType, skia.kUnpremul_AlphaType)
+    with context.surface(100, 50) as first:
+        pass
+    with context.surface(100, 50) as second:
+        assert second is first
+    image, _ = render_slide(_template(), _styles(), Slide(), context=context)
+    assert image.colorType() == skia.kRGBA_8888_ColorType
+    assert image.alphaType() == skia.kUnpremul_AlphaType
+
+
+def test_layout_job_text_prefills_shrunk_layouts():
+    template = _template()
+    style = TextStyle(name='H1', fontSize=120, letterSpacing=2)
+    region = template.textRegions[0]
+    region.overflow = 'shrink-to-fit'
+    job = Job(slides=[Slide(textBlocks=[TextBlock(region='hero', text='Очень длинный заголовок ' * 6)])])
+    cache = RenderCache()
+    layout_job_text(template, {'H1': style}, job, cache)
+    assert len(cache.layouts) == 1
+    layout = layout_text(job.slides[0].textBlocks[0].text, region, style, cache)
+    assert layout.size < 120
+    assert layout.size * style.lineHeight * len(layout.lines) <= region.height
+
+
+def test_ellipsis_trim_accounts_for_letter_spacing():
+    region = TextRegion(name='hero', x=0, y=0, width=300, height=60, overflow='ellipsis')
+    font = skia.Font(skia.Typeface('Arial'), 48)
+    for spacing in (4, 12):
+        style = TextStyle(name='H1', fontFamily='Arial', fontSize=48, letterSpacing=spacing)
+        layout = layout_text('and things', region, style)
+        for line in layout.lines:
+            assert measure_advances(line, font).sum() + (len(line) - 1) * spacing <= region.width
+
+
+def test_text_blobs_apply_letter_spacing_and_are_cached():
+    template = _template()
+    styles = {'H1': TextStyle(name='H1', fontSize=48), 'Spaced': TextStyle(name='Spaced', fontSize=48, letterSpacing=12)}
+    cache = RenderCache()
+    plain, _ = render_slide(template, styles, Slide(textBlocks=[TextBlock(region='hero', text='spacing')]), cache)
+    spaced, _ = render_slide(template, styles, Slide(textBlocks=[TextBlock(region='hero', text='spacing', style='Spaced')]), cache)
+    assert plain.tobytes() != spaced.tobytes()
+    assert len(cache.blobs) == 2
+    render_slide(template, styles, Slide(textBlocks=[TextBlock(region='hero', text='spacing', style='Spaced', color='#FF0000')]), cache)
+    assert len(cache.blobs) == 2
+
+
+def test_shadow_is_rasterized_once_per_layout_and_style():
+    template = _template()
+    styles = {'H1': TextStyle(name='H1', fontSize=48, stroke={'color': '#000000', 'width': 3}, shadow={'color': '#80000000', 'offsetY': 6, 'blur': 10})}
+    cache = RenderCache()
+    image, _ = render_slide(template, styles, Slide(textBlocks=[TextBlock(region='hero', text='shadow')]), cache)
+    render_slide(template, styles, Slide(textBlocks=[TextBlock(region='hero', text='shadow', color='#FF0000')]), cache)
+    assert len(cache.effects) == 1
+    plain, _ = render_slide(template, _styles(), Slide(textBlocks=[TextBlock(region='hero', text='shadow')]))
+    assert image.tobytes() != plain.tobytes()
+
+
+def test_iter_export_job_streams_progress_and_stops_on_cancel(tmp_path):
+    job = Job(slides=[Slide(textBlocks=[TextBlock(region='hero', text=str(i))]) for i in range(4)])
+    cancel = threading.Event()
+    seen = []
+    for event in iter_export_job(_template(), {}, job, tmp_path, cancel=cancel):
+        seen.append((event.index, event.total, event.path.name))
+        assert event.warnings == [f'[slide {event.index}] Стиль отсутствует: H1; fallback Arial']
+        if event.index == 2:
+            cancel.set()
+    assert seen == [(1, 4, 'slide_01.png'), (2, 4, 'slide_02.png')]
+    assert not (tmp_path / 'slide_03.png').exists()
+
+
+def test_compiled_template_renders_like_raw_template():
+    template = _template()
+    styles = _styles()
+    slide = Slide(textBlocks=[TextBlock(region='hero', text='compiled', color='#FF8800'), TextBlock(region='footer', text='x', style='Missing')])
+    compiled = compile_template(template, styles)
+    assert compile_template(compiled, styles) is compiled
+    assert compiled.text_regions[0].inner.width() == 920
+    raw_image, raw_warnings = render_slide(template, styles, slide)
+    raw_pixels = raw_image.tobytes()
+    image, warnings = render_slide(compiled, styles, slide)
+    assert image.tobytes() == raw_pixels
+    assert warnings == raw_warnings == ['Стиль отсутствует: Missing; fallback Arial']
+
+
+def test_compiled_template_recompiles_for_new_styles():
+    template = _template()
+    compiled = compile_template(template, _styles())
+    slide = Slide(textBlocks=[TextBlock(region='hero', text='restyled')])
+    bigger = {'H1': TextStyle(name='H1', fontSize=96)}
+    assert compile_template(compiled, bigger).styles is bigger
+    image, _ = render_slide(compiled, bigger, slide)
+    assert image.tobytes() == render_slide(template, bigger, slide)[0].tobytes()
+    assert image.tobytes() != render_slide(compiled, compiled.styles, slide)[0].tobytes()
+
+
+def test_image_cache_reloads_overwritten_file(tmp_path):
+    path = tmp_path / 'photo.png'
+    template = Template(imageRegions=[ImageRegion(name='main', x=0, y=0, width=100, height=100)])
+    slide = Slide(imageBlocks=[ImageBlock(region='main', path=str(path))])
+    cache = RenderCache()
+    for color in (0xFFFF0000, 0xFF0000FF):
+        surface = skia.Surface(64, 64)
+        surface.getCanvas().clear(color)
+        surface.makeImageSnapshot().save(str(path), skia.EncodedImageFormat.kPNG)
+        os.utime(path, ns=(color, color))
+        image, _ = render_slide(template, {}, slide, cache)
+        pixels = skia.Bitmap()
+        pixels.allocN32Pixels(100, 100, False)
+        image.readPixels(pixels.pixmap(), 0, 0)
+        assert pixels.getColor(50, 50) == color
+
+
+def test_memory_budget_charges_decoded_images_and_shadow_layers(tmp_path):
+    path = tmp_path / 'photo.png'
+    surface = skia.Surface(400, 300)
+    surface.getCanvas().clear(0xFF336699)
+    surface.makeImageSnapshot().save(str(path), skia.EncodedImageFormat.kPNG)
+    template = _template()
+    template.imageRegions = [ImageRegion(name='main', x=80, y=620, width=920, height=650)]
+    styles = {'H1': TextStyle(name='H1', fontSize=48, shadow={'blur': 8})}
+    cache = RenderCache()
+    render_slide(template, styles, Slide(textBlocks=[TextBlock(region='hero', text='shadow')], imageBlocks=[ImageBlock(region='main', path=str(path))]), cache)
+    image = cache.images.get(next(iter(cache.images)))
+    assert not image.isLazyGenerated()
+    assert cache.images.nbytes == 400 * 300 * 4
+    assert len(cache.layers) == 1
+    assert cache.layers.nbytes > cache.effects.nbytes > 0
+
+
+def test_shared_render_cache_separates_styles_and_geometry():
+    slide = Slide(textBlocks=[TextBlock(region='hero', text='shared')])
+    cache = RenderCache()
+    bigger = {'H1': TextStyle(name='H1', fontSize=96)}
+    moved = _template()
+    moved.textRegions[0].x = 300
+    for template, styles in ((_template(), _styles()), (_template(), bigger), (moved, _styles())):
+        cached, _ = render_slide(template, styles, slide, cache)
+        assert cached.tobytes() == render_slide(template, styles, slide)[0].tobytes()
+    assert len(cache.layers) == 3
+
+
+def test_export_worker_applies_its_share_of_the_memory_budget():
+    from carousel_generator.memory import default_budget
+    from carousel_generator.renderer import _init_export_worker
+
+    limit = default_budget.limit_bytes
+    try:
+        _init_export_worker(_template(), _styles(), 256 * 1024 * 1024)
+        assert default_budget.limit_bytes == 256 * 1024 * 1024
+    finally:
+        default_budget.set_limit(limit)
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from carousel_generator.models import ImageBlock, ImageRegion, Job, Slide, Template, TextBlock, TextRegion, to_dict
+from carousel_generator.snapshot import JobSnapshot, SnapshotError, dump_job, dump_template, load_job_bytes, load_template_bytes
+from carousel_generator.storage import export_job_json, import_job_json, load_job, save_job
+
+
+def _job():
+    return Job(name='big', template='carousel_default', slides=[
+        Slide(
+            textBlocks=[TextBlock(region='hero', text=f'Слайд {i}', style='H1', align='center' if i % 2 else None), TextBlock(region='sub', text='общий текст')],
+            imageBlocks=[ImageBlock(region='main', path='C:\\img.jpg', fit='cover', crop={'scale': 1.5, 'offsetX': 0.1, 'offsetY': -0.2})] if i % 3 == 0 else [],
+        )
+        for i in range(50)
+    ])
+
+
+def test_job_snapshot_round_trip_and_random_access():
+    job = _job()
+    data = dump_job(job)
+    assert to_dict(load_job_bytes(data)) == to_dict(job)
+    snapshot = JobSnapshot(data)
+    assert len(snapshot) == 50
+    assert to_dict(snapshot.slide(33)) == to_dict(job.slides[33])
+    assert len(data) < len(json.dumps(to_dict(job), ensure_ascii=False).encode('utf-8'))
+
+
+def test_template_snapshot_round_trip():
+    template = Template(
+        name='t',
+        textRegions=[TextRegion(name='hero', x=80, y=80, width=920, height=260, padding=12, overflow='shrink-to-fit', align='center', valign='middle', defaultStyle='H1')],
+        imageRegions=[ImageRegion(name='main', x=80, y=620, width=920, height=650, fit='contain')],
+    )
+    assert to_dict(load_template_bytes(dump_template(template))) == to_dict(template)
+
+
+def test_storage_uses_binary_format_from_settings(tmp_path):
+    (tmp_path / 'jobs').mkdir()
+    (tmp_path / 'settings.json').write_text(json.dumps({'storageFormat': 'binary'}), encoding='utf-8')
+    job = _job()
+    save_job(tmp_path, job)
+    assert (tmp_path / 'jobs' / 'big.cgj').exists()
+    assert not (tmp_path / 'jobs' / 'big.json').exists()
+    assert to_dict(load_job(tmp_path, 'big', 'carousel_default')) == to_dict(job)
+
+
+def test_template_snapshot_accepts_float_geometry_and_rejects_corrupt_data():
+    template = Template(name='t', textRegions=[TextRegion(name='hero', x=80.0, y=80.4, width=920.0, height=260.0)])
+    data = dump_template(template)
+    assert load_template_bytes(data).textRegions[0].x == 80
+    for broken in (data[:-6], data[:40], dump_job(_job())[:200]):
+        loader = load_template_bytes if broken[:4] == data[:4] else load_job_bytes
+        with pytest.raises(SnapshotError):
+            loader(broken)
+
+
+def test_binary_job_exports_and_imports_as_json(tmp_path):
+    (tmp_path / 'jobs').mkdir()
+    (tmp_path / 'settings.json').write_text('not json', encoding='utf-8')
+    job = _job()
+    save_job(tmp_path, job, 'binary')
+    export_job_json(load_job(tmp_path, 'big', 'carousel_default'), tmp_path / 'big_export.json')
+    assert to_dict(import_job_json(tmp_path / 'big_export.json')) == to_dict(job)